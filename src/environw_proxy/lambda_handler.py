@@ -1,58 +1,103 @@
 # -*- coding: utf-8 -*-
-"""AWS Lambda function module for processing S3 events.
+"""AWS Lambda function module for processing batches of weather events.
 
-This module defines a Lambda function for handling S3 event triggers.
-It utilizes utilities from aws_lambda_powertools and a custom process_records function.
+This module defines a Lambda function for handling SQS batches of EnvironW weather records,
+queued by API Gateway, and forwarding them to Windy and Wunderground.
+It utilizes utilities from aws_lambda_powertools and the posting functions in process.
 """
 
-import json
-from aws_lambda_powertools import Logger, Tracer  # trunk-ignore(pyright/reportMissingImports)
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
 from aws_lambda_powertools.utilities.data_classes import (  # trunk-ignore(pyright/reportMissingImports)
-    APIGatewayProxyEvent,
+    SQSEvent,
     event_source,
 )
 
 # trunk-ignore(pyright/reportMissingImports)
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
-from environw_proxy.process import post_records_wunderground, process_windy_records
+from environw_proxy.observability import logger, tracer
+from environw_proxy.process import (
+    MAX_CONCURRENT_POSTS,
+    decode_record_body,
+    post_records_wunderground,
+    process_windy_records,
+    validate_record,
+)
+
+# Shared across warm invocations so the upstream posts run concurrently without re-spawning threads.
+# Sized so the Windy post and every Wunderground post of a full SQS batch run at once.
+executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_POSTS)
+# Deadline for all upstream posts of a batch, leaving headroom under the 60 second lambda timeout.
+# Posts still running after it are reported as failed so their messages are redelivered.
+UPSTREAM_TIMEOUT = 45
 
-tracer: Tracer = Tracer(service="weather-proxy")
-logger: Logger = Logger(service="weather-proxy", utc=True, child=False)
+
+def post_succeeded(future: Future, done: set[Future]) -> bool:
+    """Check whether an upstream post finished in time without a transient failure.
+
+    Args:
+        future (Future): The future running the post.
+        done (set[Future]): The futures that completed before the deadline.
+
+    Returns:
+        bool: True if the post completed and its records do not need to be redelivered.
+    """
+    if future not in done:
+        logger.error("Upstream post did not complete in time")
+        return False
+    err = future.exception()
+    if err is not None:
+        logger.error("Upstream post raised an exception", exc_info=err)
+        return False
+    return future.result()
 
 
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler
-@event_source(data_class=APIGatewayProxyEvent)
-def handler(event: APIGatewayProxyEvent, context: LambdaContext) -> dict: # trunk-ignore(pylint/W0613)
-    """Handle an incoming API Gw event by processing records.
+@event_source(data_class=SQSEvent)
+def handler(event: SQSEvent, context: LambdaContext) -> dict: # trunk-ignore(pylint/W0613)
+    """Handle an incoming SQS batch by posting its weather records upstream.
+
+    All records in the batch are sent to Windy in a single request, while Wunderground,
+    which has no batch API, receives one request per record. Only transient upstream failures,
+    and malformed messages, are reported as failures, each without holding back the rest of the
+    batch. Permanent rejections are logged and dropped since redelivery would fail the same way.
 
     Args:
-        event (APIGatewayProxyEvent): The API Gw event triggering the lambda.
+        event (SQSEvent): The SQS batch triggering the lambda.
         context (LambdaContext): The context in which the lambda is running.
 
     Returns:
-        bool: True if the process completes successfully.
+        dict: The batch item failures, listing the messages SQS should redeliver.
     """
-    if 'weather' in event.path and event.http_method == 'POST':
-        result_windy =  process_windy_records(event=event.json_body)
-        result_wunderground = post_records_wunderground(event=event.json_body)
-        if result_windy and result_wunderground:
-            return {
-                'statusCode': 200,  # HTTP 200 OK
-                'headers': {
-                    'Content-Type': 'application/json'
-                },
-                'body': json.dumps({
-                    'message': 'POST request processed successfully'
-                })
-            }
+    failed_ids: list[str] = []
+    message_ids: list[str] = []
+    records: list[dict] = []
+    for record in event.records:
+        try:
+            records.append(validate_record(decode_record_body(record.body)))
+        except ValueError as err:
+            logger.error("Rejecting malformed weather record", extra={"message_id": record.message_id, "error": str(err)})
+            failed_ids.append(record.message_id)
+            continue
+        message_ids.append(record.message_id)
+
+    if records:
+        future_windy = executor.submit(process_windy_records, events=records)
+        futures_wunderground = [executor.submit(post_records_wunderground, event=record) for record in records]
+        done, _ = wait([future_windy, *futures_wunderground], timeout=UPSTREAM_TIMEOUT)
+
+        if post_succeeded(future_windy, done):
+            failed_ids.extend(
+                message_id
+                for message_id, future in zip(message_ids, futures_wunderground)
+                if not post_succeeded(future, done)
+            )
+        else:
+            # The whole batch shares the single Windy post, so every message has to be retried
+            failed_ids.extend(message_ids)
+
     return {
-        'statusCode': 400,
-        'headers': {
-            'Content-Type': 'application/json'
-        },
-        'body': json.dumps({
-            'message': 'POST Processing failed'
-        })
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]
     }
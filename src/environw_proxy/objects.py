@@ -7,7 +7,7 @@ from enum import Enum
 from typing import Optional, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class EnvironWRecordReadings:
     """Class representing the readings for an EnvironW Readings record."""
     pressure: float
@@ -19,7 +19,7 @@ class EnvironWRecordReadings:
     light: float
 
 
-@dataclass
+@dataclass(slots=True)
 class EnvironWRecord:
     """Class representing the readings for an EnvironW record."""
     readings: EnvironWRecordReadings
@@ -27,7 +27,7 @@ class EnvironWRecord:
     timestamp: str = field(default_factory=lambda: datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"))
 
 
-@dataclass
+@dataclass(slots=True)
 class WindyObservationRecord: # trunk-ignore(pylint/R0902)
     """Class representing an observation record for a weather station.
 
@@ -72,27 +72,30 @@ class WindyObservationRecord: # trunk-ignore(pylint/R0902)
     station: int = 0
     time: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat() + 'Z')
 
+    # Canonical field and its alternative names with any conversion to metric units, listed in order
+    # of precedence so only the first alternative that is set is applied
+    _ALIASES = (
+        ("station", (("stationId", None), ("si", None))),
+        ("time", (
+            ("ts", lambda value: datetime.fromtimestamp(int(value), tz=timezone.utc).isoformat() + 'Z'),
+            ("dateutc", lambda value: datetime.strptime(value, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%dT%H:%M:%S.000Z")),
+        )),
+        ("temp", (("tempf", lambda value: (value - 32) * 5 / 9),)),  # Convert Fahrenheit to Celsius
+        ("wind", (("windspeedmph", lambda value: value * 0.44704),)),  # Convert mph to m/s
+        ("gust", (("windgustmph", lambda value: value * 0.44704),)),  # Convert mph to m/s
+        ("humidity", (("rh", None),)),
+        ("pressure", (("baromin", lambda value: value * 3386.39), ("mbar", None))),  # Convert inches Hg to Pa
+        ("precip", (("rainin", lambda value: value * 25.4),)),  # Convert inches to mm
+    )
+
     def __post_init__(self):
         """Initialize the object after it has been created. Allows handling of alternative names and units."""
-        self.station = self.si if self.si is not None else self.station
-        self.station = self.stationId if self.stationId is not None else self.station
-        if self.ts is not None:
-            # Assuming ts is given in seconds. Convert to datetime object then to ISO format.
-            self.time = datetime.fromtimestamp(int(self.ts), tz=timezone.utc).isoformat() + 'Z'
-        elif self.dateutc is not None:
-            dt_obj = datetime.strptime(self.dateutc, "%Y-%m-%d %H:%M:%S")
-            self.time = dt_obj.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        if self.tempf is not None:
-            self.temp = (self.tempf - 32) * 5 / 9  # Convert Fahrenheit to Celsius
-        if self.windspeedmph is not None:
-            self.wind = self.windspeedmph * 0.44704  # Convert mph to m/s
-        if self.windgustmph is not None:
-            self.gust = self.windgustmph * 0.44704  # Convert mph to m/s
-        self.humidity = self.rh if self.rh is not None else self.humidity
-        self.pressure = self.mbar if self.mbar is not None else self.pressure
-        self.pressure = self.baromin * 3386.39 if self.baromin is not None else self.pressure  # Convert inches Hg to Pa
-        if self.rainin is not None:
-            self.precip = self.rainin * 25.4  # Convert inches to mm
+        for target, aliases in self._ALIASES:
+            for alias, convert in aliases:
+                value = getattr(self, alias)
+                if value is not None:
+                    setattr(self, target, value if convert is None else convert(value))
+                    break
 
 
 class WindyShareOption(Enum):
@@ -114,7 +117,7 @@ class Station(Enum):
     LIZARDHUBS = 1
 
 
-@dataclass
+@dataclass(slots=True)
 class WindyStationRecord: # trunk-ignore(pylint/R0902)
     """A record representing a weather station in the Windy ecosystem.
 
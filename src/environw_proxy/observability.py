@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Module containing the shared Powertools tracer and logger for the weather proxy."""
+
+import logging
+
+from aws_lambda_powertools import Logger, Tracer  # trunk-ignore(pyright/reportMissingImports)
+
+tracer: Tracer = Tracer(service="weather-proxy")
+logger: Logger = Logger(service="weather-proxy", utc=True, child=False)
+
+# httpx and httpcore log full request URLs at INFO and DEBUG, which include the Windy API key and
+# the Wunderground station password, so keep them to warnings and above
+for _library in ("httpx", "httpcore"):
+    logging.getLogger(_library).setLevel(logging.WARNING)
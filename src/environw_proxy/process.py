@@ -1,25 +1,74 @@
 # -*- coding: utf-8 -*-
 """Module containing functions for processing weather records."""
-import json
+import base64
 import os
-import urllib.parse
-from dataclasses import asdict
-from datetime import datetime
-from enum import Enum
+import re
+import time
+import zlib
+from functools import lru_cache
 
-import requests  # trunk-ignore(pyright/reportMissingModuleSource)
-from aws_lambda_powertools import Logger, Tracer  # trunk-ignore(pyright/reportMissingImports)
+import httpx  # trunk-ignore(pyright/reportMissingImports)
+import orjson  # trunk-ignore(pyright/reportMissingImports)
 
 from environw_proxy.objects import (  # trunk-ignore(pyright/reportMissingImports)
     EnvironWRecord,
     Station,
-    WindyObservationRecord,
+)
+from environw_proxy.observability import logger  # trunk-ignore(pyright/reportMissingImports)
+
+# Matches batch_size on the SQS event source mapping. A full batch makes one Windy post plus one
+# Wunderground post per record, all of which run concurrently.
+BATCH_SIZE = 10
+MAX_CONCURRENT_POSTS = BATCH_SIZE + 1
+
+# Module level client so warm invocations reuse pooled connections to the upstream APIs, with
+# HTTP/2 multiplexing the concurrent Wunderground requests over a single connection
+client: httpx.Client = httpx.Client(
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT_POSTS, max_keepalive_connections=4),
+    ),
+)
+
+# Transient gateway errors are retried with a short exponential backoff, the transport only retries
+# connection failures. Only idempotent GETs are retried, as a gateway error on the Windy POST may
+# arrive after Windy has already accepted the data.
+RETRY_METHODS: frozenset[str] = frozenset({"GET"})
+RETRY_STATUS_CODES: frozenset[int] = frozenset({502, 503, 504})
+STATUS_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.1
+
+# Station lookups are precomputed at import so resolving a nickname never iterates the enum
+STATION_BY_NAME: dict[str, int] = {station.name: station.value for station in Station}
+DEFAULT_STATION_VALUE = 0
+NON_ALNUM_PATTERN: re.Pattern = re.compile(r"[\W_]+")
+REQUIRED_READINGS: tuple[str, ...] = (
+    "temperature", "wind_speed", "wind_direction", "humidity", "pressure", "rain", "light",
 )
 
-tracer: Tracer = Tracer(service="weather-proxy")
-logger: Logger = Logger(service="weather-proxy", utc=True, child=True)
+# Unit conversion factors for the imperial values Wunderground expects
+MPS_TO_MPH = 2.23694
+MM_TO_INCHES = 0.0393701
+
+# Base64 encoding of the gzip magic number, marking compressed message bodies
+GZIP_BASE64_PREFIX = "H4sI"
+# Upper bound on a decompressed body, far above a batch of readings, so a small message cannot
+# inflate into enough data to exhaust the lambda's memory
+MAX_DECOMPRESSED_BODY = 1024 * 1024
+
+# Credentials are fixed for the lifetime of the Lambda container, so read them once at import
+WINDY_API_KEY: str | None = os.environ.get("WINDY_API_KEY", None)
+WUNDERGROUND_CREDENTIALS: dict[int, tuple[str | None, str | None]] = {
+    station_value: (
+        os.environ.get(f"WUNDERGROUND_STATION_ID_{station_value}", None),
+        os.environ.get(f"WUNDERGROUND_STATION_KEY_{station_value}", None),
+    )
+    for station_value in STATION_BY_NAME.values()
+}
 
 
+@lru_cache(maxsize=32)
 def get_station_value(station_name: str) -> int:
     """Get the value of a station based on its name.
     
@@ -29,177 +78,172 @@ def get_station_value(station_name: str) -> int:
     Returns:
         int: The value of the station.
     """
-    # Normalize the input to match the enumeration naming convention
-    normalized_input = ''.join(filter(str.isalnum, station_name)).upper()
-    
-    # Attempt to match the normalized input with an enum member
-    for station in Station:
-        if station.name == normalized_input:
-            return station.value
-
-    # Default return value if no match is found
-    return 0
+    # Normalize the input to match the enumeration naming convention, defaulting if no member matches
+    return STATION_BY_NAME.get(NON_ALNUM_PATTERN.sub('', station_name).upper(), DEFAULT_STATION_VALUE)
 
 
-def mps_to_mph(speed_mps: float) -> float:
-    """Convert speed from m/s to mph.
+def decode_record_body(body: str) -> EnvironWRecord:
+    """Decode a queued EnvironWRecord, accepting either plain or base64 encoded gzip JSON.
 
     Args:
-        speed_mps (float): The speed in meters per second.
+        body (str): The message body.
 
     Returns:
-        float: The speed in miles per hour.
-    """
-    return speed_mps * 2.23694
-
-
-def fahrenheit_to_celsius(fahrenheit: float) -> float:
-    """Convert temperature from Fahrenheit to Celsius.
-
-    Args:
-        fahrenheit (float): Temperature in Fahrenheit.
+        EnvironWRecord: The decoded EnvironWRecord event.
 
-    Returns:
-        float: Temperature in Celsius.
+    Raises:
+        ValueError: If the body is not valid JSON, base64 or gzip, or decompresses beyond
+            MAX_DECOMPRESSED_BODY.
     """
-    return (fahrenheit - 32) * 5 / 9
-
-
-
-def celsius_to_fahrenheit(celsius: float) -> float:
-    """Convert temperature from Celsius to Fahrenheit.
+    if body.startswith(GZIP_BASE64_PREFIX):
+        # wbits=31 tells zlib to expect a gzip header and trailer
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            decompressed = decompressor.decompress(base64.b64decode(body, validate=True), MAX_DECOMPRESSED_BODY)
+        except zlib.error as err:
+            msg_gzip = f"Invalid gzip message body: {err}"
+            raise ValueError(msg_gzip) from err
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            msg_size = f"Message body is truncated or decompresses beyond {MAX_DECOMPRESSED_BODY} bytes"
+            raise ValueError(msg_size)
+        return orjson.loads(decompressed)
+    return orjson.loads(body)
+
+
+def validate_record(event: EnvironWRecord) -> EnvironWRecord:
+    """Check that a decoded EnvironWRecord has the fields needed to post it upstream.
 
     Args:
-        celsius (float): Temperature in Celsius.
+        event (EnvironWRecord): The decoded EnvironWRecord event.
 
     Returns:
-        float: Temperature in Fahrenheit.
-    """
-    return (celsius * 9 / 5) + 32
+        EnvironWRecord: The same event, once validated.
 
-def mm_to_inches(length_mm: float) -> float:
-    """Convert length from millimeters to inches.
+    Raises:
+        ValueError: If the event is missing its nickname, timestamp or any of the readings, or a
+            reading is not a number.
+    """
+    if not isinstance(event, dict) or not isinstance(event.get('readings'), dict):
+        msg_record = "Weather record must be an object with a readings object"
+        raise ValueError(msg_record)
+    missing = [key for key in ("nickname", "timestamp") if not isinstance(event.get(key), str)]
+    missing += [key for key in REQUIRED_READINGS if key not in event['readings']]
+    if missing:
+        msg_missing = f"Weather record is missing {', '.join(missing)}"
+        raise ValueError(msg_missing)
+    # bool is a subclass of int but is never a valid reading
+    invalid = [
+        key for key in REQUIRED_READINGS
+        if isinstance(event['readings'][key], bool) or not isinstance(event['readings'][key], int | float)
+    ]
+    if invalid:
+        msg_invalid = f"Weather record has non-numeric readings for {', '.join(invalid)}"
+        raise ValueError(msg_invalid)
+    return event
+
+
+def send_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request with the shared client, retrying transient gateway errors for RETRY_METHODS.
 
     Args:
-        length_mm (float): mm length.
+        method (str): The HTTP method.
+        url (str): The URL to request.
+        **kwargs: Further arguments passed to httpx.Client.request.
 
     Returns:
-        float: inches length.
+        httpx.Response: The final response, which may still be a gateway error once retries run out.
     """
-    return length_mm * 0.0393701
+    if method not in RETRY_METHODS:
+        return client.request(method, url, **kwargs)
+    for attempt in range(STATUS_RETRIES):
+        response = client.request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUS_CODES:
+            return response
+        logger.warning("Retrying after gateway error", extra={"status_code": response.status_code})
+        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+    return client.request(method, url, **kwargs)
 
 
-def convert_date_time(date_time: str) -> str:
-    """Convert date and time to a format that can be used in the API.
+def record_to_dict(event: EnvironWRecord) -> dict:
+    """Build a Windy observation dict directly from the EnvironWRecord event.
 
     Args:
-        date_time (str): The date and time.
+        event (EnvironWRecord): The EnvironWRecord event.
 
     Returns:
-        str: The date and time in the correct format, urlescaped.
+        dict: The observation keyed by the Windy field names.
     """
-    dt = datetime.strptime(date_time, "%Y-%m-%d %H:%M:%S")
-    formatted_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-    return urllib.parse.quote_plus(formatted_str)
+    readings = event['readings']
+    return {
+        "station": get_station_value(event['nickname']),
+        "time": event['timestamp'],
+        "temp": readings['temperature'],
+        "wind": readings['wind_speed'],
+        "windir": readings['wind_direction'],
+        "gust": 0,
+        "humidity": readings['humidity'],
+        "dewpoint": 0,
+        "pressure": readings['pressure'],
+        "precip": readings['rain'],
+        "uv": readings['light'],
+    }
+
 
-def get_source_object(event: EnvironWRecord) -> list[WindyObservationRecord]:
-    """Get the source object from the EnvironWRecord event.
+def is_delivered(response: httpx.Response, upstream: str) -> bool:
+    """Check whether an upstream response settles the post or it should be retried.
+
+    Only server errors are treated as transient. Any other rejection, such as invalid credentials,
+    would fail the same way on every redelivery, so it is logged and the records are dropped.
 
     Args:
-        event (EnvironWRecord): The EnvironWRecord event.
+        response (httpx.Response): The upstream response.
+        upstream (str): The upstream name, used in log messages.
 
     Returns:
-        list[WindyObservationRecord]: The list of WindyObservationRecord objects.
+        bool: False if the post should be retried, True otherwise.
     """
-    weather_records: list[WindyObservationRecord] = []
-
-    logger.info(f'Weather Record: {event}')
-    station = get_station_value(event['nickname'])
-    weather_records.append(WindyObservationRecord(
-        temp=event['readings']['temperature'],
-        wind=event['readings']['wind_speed'],
-        windir=event['readings']['wind_direction'],
-        gust=0,
-        humidity=event['readings']['humidity'],
-        dewpoint=0,
-        pressure=event['readings']['pressure'],
-        precip=event['readings']['rain'],
-        uv=event['readings']['light'],
-        station=station,
-        time=event['timestamp']
-    ))
-
-    return weather_records
-
-
-def complex_handler(obj):
-    """Custom JSON serializer for objects not serializable by default json code."""
-    if isinstance(obj, Enum):
-        return obj.value  # Or obj.name if you prefer to serialize the enum name
-    if hasattr(obj, '__dict__'):
-        return obj.__dict__
-    if isinstance(obj, set):
-        return list(obj)  # Convert sets to lists
-    msg_handler = f"Object of type {obj.__class__.__name__} is not JSON serializable"
-    raise TypeError(msg_handler)
+    extra = {"response": response.text, "status_code": response.status_code}
+    if response.is_success:
+        logger.debug(f"Successfully posted to {upstream}", extra=extra)
+        return True
+    if response.is_server_error:
+        logger.error(f"Failed to post data to {upstream}, records will be retried", extra=extra)
+        return False
+    logger.error(f"{upstream} rejected the post, dropping records", extra=extra)
+    return True
 
 
 def post_records_windy(json_payload: dict) -> bool:
     """Post the weather records to the Windy API.
 
     Args:
-        json_payload (dict): The list of WindyObservationRecord objects.
+        json_payload (dict): The payload to send, with the observation dicts under `observations`.
 
     Returns:
-        bool: True if the records are successfully posted.
+        bool: False if a transient failure means the records should be redelivered, True once they
+            are posted or permanently rejected.
     """
-    logger.debug(f"Posting {len(json_payload)} weather records")
-    success_status_code = 200
+    logger.debug("Posting weather records", extra={"count": len(json_payload['observations'])})
 
-    api_key = os.environ.get("WINDY_API_KEY", None)
-    if api_key is None:
-        logger.error("WINDY_API_KEY environment variable not set")
-        return False
-    endpoint_url = f"https://stations.windy.com/pws/update/{api_key}"
+    if WINDY_API_KEY is None:
+        logger.error("WINDY_API_KEY environment variable not set, dropping records")
+        return True
+    endpoint_url = f"https://stations.windy.com/pws/update/{WINDY_API_KEY}"
 
     headers = {
     'Content-Type': 'application/json'
     }
 
     try:
-        logger.info(f"Posting Observation record: {json_payload}")
+        logger.info("Posting Observation record", extra={"payload": json_payload})
         # Make the POST request with a timeout of 5 seconds
-        response = requests.post(endpoint_url, json=json_payload, headers=headers, timeout=5)
-        # Check the response
-        if response.status_code == success_status_code:
-            print("Data successfully posted to Windy.com")
-        else:
-            print("Failed to post data:", response.text)
-    except requests.exceptions.RequestException as err:
+        payload = orjson.dumps(json_payload)
+        response = send_request("POST", endpoint_url, content=payload, headers=headers, timeout=5)
+    except httpx.HTTPError as err:
+        # Timeouts and connection failures are transient, so the records are redelivered
         logger.error(f"Error submitting weather record: {str(err)}")
         return False
-    return True
-
-
-def create_observation_record(event: EnvironWRecord) -> WindyObservationRecord:
-    """Create a WindyObservationRecord object from an EnvironWRecord event.
-
-    Args:
-        event (EnvironWRecord): The EnvironWRecord event.
-
-    Returns:
-        WindyObservationRecord: The WindyObservationRecord object.
-    """
-    return WindyObservationRecord(
-        temp=event['readings']['temperature'],
-        wind=event['readings']['wind_speed'],
-        windir=event['readings']['wind_direction'],
-        humidity=event['readings']['humidity'],
-        pressure=event['readings']['pressure'],
-        precip=event['readings']['rain'],
-        station=get_station_value(event['nickname']),
-        time=event['timestamp']
-    )
+    return is_delivered(response, "Windy.com")
 
 
 def post_records_wunderground(event: EnvironWRecord) -> bool:
@@ -209,41 +253,47 @@ def post_records_wunderground(event: EnvironWRecord) -> bool:
         event (EnvironWRecord): The EnvironWRecord event.
 
     Returns:
-        bool: True if the records are successfully posted.
+        bool: False if a transient failure means the record should be redelivered, True once it
+            is posted or permanently rejected.
     """
     url_wunderground = "https://weatherstation.wunderground.com/weatherstation/updateweatherstation.php"
-    station_id = os.environ.get(f"WUNDERGROUND_STATION_ID_{get_station_value(event['nickname'])}", None)
-    station_key = os.environ.get(f"WUNDERGROUND_STATION_KEY_{get_station_value(event['nickname'])}", None)
+    station_id, station_key = WUNDERGROUND_CREDENTIALS.get(get_station_value(event['nickname']), (None, None))
     if station_id is None or station_key is None:
-        logger.error("WUNDERGROUND_STATION_ID or WUNDERGROUND_STATION_KEY environment variables not set")
-        return False
-    try:
-        parameters = f"ID={station_id}&PASSWORD={station_key}&dateutc={convert_date_time(event['timestamp'])}&winddir={event['readings']['wind_direction']}&windspeedmph={mps_to_mph(event['readings']['wind_speed'])}&tempf={celsius_to_fahrenheit(event['readings']['temperature'])}&rainin={mm_to_inches(event['readings']['rain'])}&humidity={event['readings']['humidity']}&baromin={event['readings']['pressure']}&action=updateraw"
-        logger.debug(f"Subbmitting to Wunderground: {parameters}")
-        result = requests.get(f"{url_wunderground}?{parameters}", timeout=5)
-        logger.debug(f"Successfully posted to Wunderground, {result.text}, {result.status_code}")
+        logger.error("WUNDERGROUND_STATION_ID or WUNDERGROUND_STATION_KEY environment variables not set, dropping record")
         return True
-    except requests.exceptions.RequestException as err:
+    readings = event['readings']
+    try:
+        parameters = {
+            "ID": station_id,
+            "PASSWORD": station_key,
+            "dateutc": event['timestamp'],
+            "winddir": readings['wind_direction'],
+            "windspeedmph": readings['wind_speed'] * MPS_TO_MPH,
+            "tempf": readings['temperature'] * 9 / 5 + 32,
+            "rainin": readings['rain'] * MM_TO_INCHES,
+            "humidity": readings['humidity'],
+            "baromin": readings['pressure'],
+            "action": "updateraw",
+        }
+        logger.debug("Submitting to Wunderground", extra={"parameters": parameters})
+        # httpx urlencodes the parameters, including the space in dateutc
+        result = send_request("GET", url_wunderground, params=parameters, timeout=5)
+        return is_delivered(result, "Wunderground")
+    except httpx.HTTPError as err:
+        # Timeouts and connection failures are transient, so the record is redelivered
         logger.error(f"Error submitting weather record: {str(err)}")
         return False
 
 
-def process_windy_records(event: EnvironWRecord) -> bool:
-    """Process the weather records.
+def process_windy_records(events: list[EnvironWRecord]) -> bool:
+    """Process a batch of weather records into a single Windy post.
 
     Args:
-        event (EnvironWRecord): The EnvironWRecord event.
+        events (list[EnvironWRecord]): The EnvironWRecord events.
 
     Returns:
-        bool: True if the records are successfully processed.
+        bool: False if a transient failure means the records should be redelivered, True once they
+            are posted or permanently rejected.
     """
-    weather_records: list[WindyObservationRecord] = get_source_object(event=event)
-    logger.debug(f"Total records to process: {len(weather_records)}")
-    observations: list = []
-    for record in weather_records:
-        observations.append(json.dumps(asdict(record), default=complex_handler))
-    json_payload = {
-        'observations': observations
-    }
-
-    return post_records_windy(json_payload=json_payload)
+    logger.info("Weather Records", extra={"records": events})
+    return post_records_windy(json_payload={'observations': [record_to_dict(event) for event in events]})
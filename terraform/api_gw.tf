@@ -26,10 +26,14 @@ resource "aws_apigatewayv2_stage" "lambda" {
 }
 
 resource "aws_apigatewayv2_integration" "weather_lambda" {
-  api_id             = aws_apigatewayv2_api.lambda.id
-  integration_uri    = aws_lambda_function.weather_lambda.invoke_arn
-  integration_type   = "AWS_PROXY"
-  integration_method = "POST"
+  api_id              = aws_apigatewayv2_api.lambda.id
+  credentials_arn     = aws_iam_role.api_gw_sqs.arn
+  integration_type    = "AWS_PROXY"
+  integration_subtype = "SQS-SendMessage"
+  request_parameters = {
+    QueueUrl    = aws_sqs_queue.weather.url
+    MessageBody = "$request.body"
+  }
 }
 
 resource "aws_apigatewayv2_route" "weather_lambda" {
@@ -37,3 +41,14 @@ resource "aws_apigatewayv2_route" "weather_lambda" {
   route_key = "POST /weather"
   target    = "integrations/${aws_apigatewayv2_integration.weather_lambda.id}"
 }
+
+resource "aws_iam_role" "api_gw_sqs" {
+  name               = "api_gw_sqs"
+  assume_role_policy = data.aws_iam_policy_document.api_gw_assume_role.json
+}
+
+resource "aws_iam_role_policy" "api_gw_sqs" {
+  name   = "api_gw_sqs"
+  role   = aws_iam_role.api_gw_sqs.id
+  policy = data.aws_iam_policy_document.api_gw_sqs.json
+}
@@ -13,6 +13,27 @@ data "aws_iam_policy_document" "assume_role" {
   }
 }
 
+data "aws_iam_policy_document" "api_gw_assume_role" {
+  statement {
+    effect = "Allow"
+
+    principals {
+      type        = "Service"
+      identifiers = ["apigateway.amazonaws.com"]
+    }
+
+    actions = ["sts:AssumeRole"]
+  }
+}
+
+data "aws_iam_policy_document" "api_gw_sqs" {
+  statement {
+    effect    = "Allow"
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.weather.arn]
+  }
+}
+
 data "aws_iam_policy_document" "lambda_execution_policy" {
   statement {
     actions = [
@@ -37,6 +58,18 @@ data "aws_iam_policy_document" "lambda_execution_policy" {
     resources = ["arn:aws:logs:*:*:*"]
   }
 
+  statement {
+    effect = "Allow"
+
+    actions = [
+      "sqs:ReceiveMessage",
+      "sqs:DeleteMessage",
+      "sqs:GetQueueAttributes",
+    ]
+
+    resources = [aws_sqs_queue.weather.arn]
+  }
+
   statement {
     effect    = "Allow"
     resources = ["*"]
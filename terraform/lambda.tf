@@ -2,16 +2,15 @@ data "local_file" "lambda_handler_zip" {
   filename = "${path.root}/../package/out/my-lambda.zip"
 }
 
-# trunk-ignore(trivy/AVD-AWS-0066,checkov/CKV_AWS_50,checkov/CKV_AWS_116,checkov/CKV_AWS_117,checkov/CKV_AWS_116,checkov/CKV_AWS_173,checkov/CKV_AWS_272,semgrep/terraform.aws.security.aws-lambda-x-ray-tracing-not-active.aws-lambda-x-ray-tracing-not-active)
+# trunk-ignore(trivy/AVD-AWS-0066,checkov/CKV_AWS_50,checkov/CKV_AWS_115,checkov/CKV_AWS_116,checkov/CKV_AWS_117,checkov/CKV_AWS_116,checkov/CKV_AWS_173,checkov/CKV_AWS_272,semgrep/terraform.aws.security.aws-lambda-x-ray-tracing-not-active.aws-lambda-x-ray-tracing-not-active)
 resource "aws_lambda_function" "weather_lambda" {
-  filename                       = data.local_file.lambda_handler_zip.filename
-  function_name                  = "environw_proxy"
-  role                           = aws_iam_role.iam_for_lambda.arn
-  handler                        = "environw_proxy.lambda_handler.handler"
-  runtime                        = "python3.11"
-  source_code_hash               = data.local_file.lambda_handler_zip.content_sha256
-  timeout                        = 60
-  reserved_concurrent_executions = 2
+  filename         = data.local_file.lambda_handler_zip.filename
+  function_name    = "environw_proxy"
+  role             = aws_iam_role.iam_for_lambda.arn
+  handler          = "environw_proxy.lambda_handler.handler"
+  runtime          = "python3.11"
+  source_code_hash = data.local_file.lambda_handler_zip.content_sha256
+  timeout          = 60
   environment { # trunk-ignore(semgrep/terraform.aws.security.aws-lambda-environment-unencrypted.aws-lambda-environment-unencrypted)
     variables = {
       WINDY_API_KEY              = var.windy_api_key
@@ -52,10 +51,14 @@ resource "aws_iam_role_policy_attachment" "lambda_execution_policy" {
   policy_arn = aws_iam_policy.lambda_execution_policy.arn
 }
 
-resource "aws_lambda_permission" "api_gw" {
-  statement_id  = "AllowExecutionFromAPIGateway"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.weather_lambda.function_name
-  principal     = "apigateway.amazonaws.com"
-  source_arn    = "${aws_apigatewayv2_api.lambda.execution_arn}/*/*"
+resource "aws_lambda_event_source_mapping" "weather_queue" {
+  event_source_arn                   = aws_sqs_queue.weather.arn
+  function_name                      = aws_lambda_function.weather_lambda.arn
+  batch_size                         = 10
+  maximum_batching_window_in_seconds = 60
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = 2
+  }
 }
@@ -0,0 +1,32 @@
+resource "aws_sqs_queue" "weather" {
+  name                       = "weather_queue"
+  visibility_timeout_seconds = 420 # Six times the lambda timeout plus the batching window, as recommended for SQS event sources
+  message_retention_seconds  = 3600
+  sqs_managed_sse_enabled    = true
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.weather_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Name = "weather_queue"
+  }
+}
+
+resource "aws_sqs_queue" "weather_dlq" {
+  name                      = "weather_dlq"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+
+  tags = {
+    Name = "weather_dlq"
+  }
+}
+
+resource "aws_sqs_queue_redrive_allow_policy" "weather_dlq" {
+  queue_url = aws_sqs_queue.weather_dlq.id
+  redrive_allow_policy = jsonencode({
+    redrivePermission = "byQueue"
+    sourceQueueArns   = [aws_sqs_queue.weather.arn]
+  })
+}
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Tests for the SQS batch handling in the lambda handler."""
+
+import gzip
+import json
+
+import httpx
+import orjson
+import pytest
+
+from environw_proxy import process
+from environw_proxy.lambda_handler import handler
+from tests.utils import LambdaContext, base64_body, gzip_body, sqs_event, weather_record
+
+
+class Upstream:
+    """Mock Windy and Wunderground APIs, recording the requests they receive."""
+
+    def __init__(self):
+        """Initialize with every request succeeding."""
+        self.windy_status = 200
+        self.wunderground_statuses: dict[str, int] = {}
+        self.windy_requests: list[httpx.Request] = []
+        self.wunderground_requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        """Respond to a request sent through the mocked transport."""
+        if request.url.host == "stations.windy.com":
+            self.windy_requests.append(request)
+            return httpx.Response(self.windy_status)
+        self.wunderground_requests.append(request)
+        return httpx.Response(self.wunderground_statuses.get(request.url.params["ID"], 200))
+
+    @property
+    def windy_observations(self) -> list[dict]:
+        """The observations sent in each Windy post."""
+        return [orjson.loads(request.content)["observations"] for request in self.windy_requests]
+
+
+@pytest.fixture()
+def upstream(monkeypatch) -> Upstream:
+    """Route the upstream client through a mock transport with credentials for both stations."""
+    mock = Upstream()
+    monkeypatch.setattr(process, "client", httpx.Client(transport=httpx.MockTransport(mock)))
+    monkeypatch.setattr(process, "WINDY_API_KEY", "windy-key")
+    monkeypatch.setattr(process, "WUNDERGROUND_CREDENTIALS", {
+        0: ("station-0", "key-0"),
+        1: ("station-1", "key-1"),
+    })
+    return mock
+
+
+def failed_ids(result: dict) -> list[str]:
+    """Extract the failed message ids from a handler result."""
+    return sorted(failure["itemIdentifier"] for failure in result["batchItemFailures"])
+
+
+def test_full_batch_posts_once_to_windy(upstream):
+    """A full batch is sent to Windy in one post and to Wunderground once per record."""
+    bodies = [json.dumps(weather_record(temperature=index)) for index in range(process.BATCH_SIZE)]
+
+    result = handler(sqs_event(*bodies), LambdaContext())
+
+    assert failed_ids(result) == []
+    assert len(upstream.windy_requests) == 1
+    assert [obs["temp"] for obs in upstream.windy_observations[0]] == list(range(process.BATCH_SIZE))
+    assert len(upstream.wunderground_requests) == process.BATCH_SIZE
+
+
+def test_windy_server_error_fails_every_message(upstream):
+    """A Windy server error marks every message of the batch as failed."""
+    upstream.windy_status = 500
+
+    result = handler(sqs_event(*[json.dumps(weather_record())] * 3), LambdaContext())
+
+    assert failed_ids(result) == ["msg-0", "msg-1", "msg-2"]
+
+
+def test_windy_rejection_is_dropped(upstream):
+    """A Windy client error would fail again on redelivery, so no message is failed."""
+    upstream.windy_status = 400
+
+    result = handler(sqs_event(*[json.dumps(weather_record())] * 3), LambdaContext())
+
+    assert failed_ids(result) == []
+
+
+def test_wunderground_server_error_fails_only_its_message(upstream):
+    """A Wunderground server error marks only that record's message as failed."""
+    upstream.wunderground_statuses = {"station-0": 500}
+    bodies = [
+        json.dumps(weather_record(nickname="lizard-hubs")),
+        json.dumps(weather_record(nickname="olliver-home")),
+        gzip_body(weather_record(nickname="lizard-hubs")),
+    ]
+
+    result = handler(sqs_event(*bodies), LambdaContext())
+
+    assert failed_ids(result) == ["msg-1"]
+    assert len(upstream.windy_observations[0]) == len(bodies)
+
+
+def test_wunderground_rejection_is_dropped(upstream):
+    """A Wunderground client error, such as bad credentials, is logged without failing the message."""
+    upstream.wunderground_statuses = {"station-0": 401}
+    bodies = [
+        json.dumps(weather_record(nickname="lizard-hubs")),
+        json.dumps(weather_record(nickname="olliver-home")),
+    ]
+
+    result = handler(sqs_event(*bodies), LambdaContext())
+
+    assert failed_ids(result) == []
+    assert len(upstream.wunderground_requests) == len(bodies)
+
+
+def test_missing_wunderground_credentials_is_dropped(upstream, monkeypatch):
+    """A station without Wunderground credentials is still posted to Windy and not failed."""
+    monkeypatch.setattr(process, "WUNDERGROUND_CREDENTIALS", {1: ("station-1", "key-1")})
+    bodies = [
+        json.dumps(weather_record(nickname="lizard-hubs")),
+        json.dumps(weather_record(nickname="olliver-home")),
+    ]
+
+    result = handler(sqs_event(*bodies), LambdaContext())
+
+    assert failed_ids(result) == []
+    assert len(upstream.windy_observations[0]) == len(bodies)
+    assert [request.url.params["ID"] for request in upstream.wunderground_requests] == ["station-1"]
+
+
+@pytest.mark.parametrize("malformed_body", [
+    "not json",
+    json.dumps({"nickname": "lizard-hubs", "timestamp": "2024-03-01 12:00:00"}),
+    json.dumps(weather_record(temperature=None)),
+    json.dumps(weather_record(temperature="12.5")),
+    json.dumps(weather_record(temperature=True)),
+    # Inflates past MAX_DECOMPRESSED_BODY
+    base64_body(gzip.compress(b" " * (process.MAX_DECOMPRESSED_BODY + 1))),
+    # Gzip stream with its 8 byte trailer cut off
+    base64_body(gzip.compress(json.dumps(weather_record()).encode())[:-8]),
+    # Valid gzip header followed by a corrupt deflate stream
+    base64_body(gzip.compress(b"{}")[:10] + b"\xff" * 12),
+])
+def test_malformed_message_fails_only_itself(upstream, malformed_body):
+    """A malformed message is reported as failed while the rest of the batch is posted."""
+    bodies = [json.dumps(weather_record()), malformed_body, json.dumps(weather_record())]
+    valid_count = len(bodies) - 1
+
+    result = handler(sqs_event(*bodies), LambdaContext())
+
+    assert failed_ids(result) == ["msg-1"]
+    assert len(upstream.windy_observations[0]) == valid_count
+    assert len(upstream.wunderground_requests) == valid_count
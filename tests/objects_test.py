@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Tests for the alternative name handling of WindyObservationRecord."""
+
+import pytest
+
+from environw_proxy.objects import WindyObservationRecord
+
+
+def observation(**kwargs) -> WindyObservationRecord:
+    """Build an observation with every canonical reading unset apart from those given."""
+    readings = dict.fromkeys(
+        ("temp", "wind", "windir", "gust", "humidity", "dewpoint", "pressure", "precip", "uv"),
+    )
+    return WindyObservationRecord(**{**readings, **kwargs})
+
+
+def test_ts_takes_precedence_over_dateutc():
+    """An unparsable dateutc is ignored when ts is set."""
+    record = observation(ts="0", dateutc="not a date")
+
+    assert record.time == "1970-01-01T00:00:00+00:00Z"
+
+
+def test_dateutc_sets_time_without_ts():
+    """Without ts, dateutc is converted to the ISO 8601 time."""
+    record = observation(dateutc="2024-03-01 12:00:00")
+
+    assert record.time == "2024-03-01T12:00:00.000Z"
+
+
+def test_station_id_takes_precedence_over_si():
+    """The station is taken from stationId over si."""
+    si, station_id = 1, 2
+
+    assert observation(si=si, stationId=station_id).station == station_id
+    assert observation(si=si).station == si
+
+
+def test_baromin_takes_precedence_over_mbar():
+    """baromin, converted from inches Hg to Pa, wins over mbar for the pressure."""
+    mbar, baromin = 1000, 30
+
+    assert observation(mbar=mbar, baromin=baromin).pressure == pytest.approx(baromin * 3386.39)
+    assert observation(mbar=mbar).pressure == mbar
+
+
+def test_tempf_is_converted_to_celsius():
+    """The temperature is converted from tempf in Fahrenheit to Celsius."""
+    assert observation(tempf=212).temp == pytest.approx(100)
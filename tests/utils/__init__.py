@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Helpers for building lambda events and contexts in tests."""
+
+import base64
+import gzip
+import json
+from dataclasses import dataclass
+
+
+@dataclass
+class LambdaContext:
+    """Minimal stand-in for the context passed to the lambda handler."""
+    function_name: str = "environw_proxy"
+    memory_limit_in_mb: int = 128
+    invoked_function_arn: str = "arn:aws:lambda:eu-west-2:123456789012:function:environw_proxy"
+    aws_request_id: str = "test-request"
+
+
+def weather_record(nickname: str = "lizard-hubs", temperature: float = 12.5) -> dict:
+    """Build an EnvironW weather record as posted by the weather board.
+
+    Args:
+        nickname (str): The station nickname.
+        temperature (float): The temperature reading in °C.
+
+    Returns:
+        dict: The weather record.
+    """
+    return {
+        "readings": {
+            "temperature": temperature,
+            "wind_speed": 3.2,
+            "wind_direction": 180,
+            "humidity": 80.0,
+            "pressure": 1012.0,
+            "rain": 0.4,
+            "light": 250.0,
+        },
+        "nickname": nickname,
+        "timestamp": "2024-03-01 12:00:00",
+    }
+
+
+def gzip_body(record: dict) -> str:
+    """Encode a weather record as a base64 gzip message body.
+
+    Args:
+        record (dict): The weather record.
+
+    Returns:
+        str: The encoded message body.
+    """
+    return base64_body(gzip.compress(json.dumps(record).encode()))
+
+
+def base64_body(data: bytes) -> str:
+    """Encode raw bytes, such as a hand built gzip stream, as a base64 message body.
+
+    Args:
+        data (bytes): The bytes to encode.
+
+    Returns:
+        str: The encoded message body.
+    """
+    return base64.b64encode(data).decode()
+
+
+def sqs_event(*bodies: str) -> dict:
+    """Build an SQS event with one message per body, with message ids msg-0, msg-1, ...
+
+    Args:
+        *bodies (str): The message bodies.
+
+    Returns:
+        dict: The SQS event.
+    """
+    return {
+        "Records": [
+            {
+                "messageId": f"msg-{index}",
+                "receiptHandle": f"handle-{index}",
+                "body": body,
+                "attributes": {},
+                "messageAttributes": {},
+                "eventSource": "aws:sqs",
+                "eventSourceARN": "arn:aws:sqs:eu-west-2:123456789012:weather_queue",
+                "awsRegion": "eu-west-2",
+            }
+            for index, body in enumerate(bodies)
+        ]
+    }